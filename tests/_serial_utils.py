@@ -0,0 +1,71 @@
+"""Serial-port helpers shared by the firmware test and benchmark scripts."""
+
+import re
+import time
+import serial
+import serial.tools.list_ports
+
+try:
+    import termios
+except ImportError: # Windows
+    termios = None
+
+# Common Arduino identifiers in the port description
+# Note: "USB Serial" is common for CH340 clones
+_ARDUINO_RE = re.compile(r"Arduino|CH340|USB Serial")
+
+def find_arduino_port():
+    """
+    Auto-detects the serial port of the Arduino.
+    Returns the port name (e.g., '/dev/ttyACM0' or 'COM3').
+    Raises Exception if not found.
+    """
+    ports = list(serial.tools.list_ports.comports())
+    for p in ports:
+        if _ARDUINO_RE.search(p.description) or "ACM" in p.device:
+            print(f"Auto-detected Arduino on port: {p.device} ({p.description})")
+            return p.device
+    
+    # Fallback/Error
+    print("Available ports:")
+    for p in ports:
+        print(f" - {p.device}: {p.description}")
+    raise Exception("Could not find Arduino. Please specify port manually using --port")
+
+def open_serial(port, baudrate, timeout, reset=True):
+    """
+    Opens the serial port to the Arduino.
+
+    On POSIX, HUPCL is cleared so DTR stays asserted when the port is closed;
+    the next open then produces no DTR edge and does not reset the board.
+
+    With reset=True the board is reset explicitly (DTR pulse) and we wait for
+    the bootloader to hand over to the firmware. With reset=False neither the
+    pulse nor the wait happens. That only avoids a reset if DTR was left
+    asserted by a previous open_serial() call: the first open after plugging
+    the board in (or after another program closed the port with HUPCL set)
+    still resets it, and the driver may reset it on open on Windows.
+
+    The cleared HUPCL flag belongs to the tty and persists after the script
+    exits, so it affects every program that opens the port later, including
+    the desktop app's RealDeviceClient, which expects opening the port to
+    reset the board. Callers must therefore always send STOP before closing.
+    Restore the default by re-plugging the board or with
+    ``stty -F <port> hupcl``.
+    """
+    ser = serial.Serial()
+    ser.port = port
+    ser.baudrate = baudrate
+    ser.timeout = timeout
+    ser.open()
+    if termios is not None:
+        attrs = termios.tcgetattr(ser.fileno())
+        attrs[2] &= ~termios.HUPCL # cflag
+        termios.tcsetattr(ser.fileno(), termios.TCSANOW, attrs)
+    if reset:
+        ser.dtr = False
+        time.sleep(0.1)
+        ser.dtr = True
+        time.sleep(2.0) # Wait for Arduino reset
+    ser.reset_input_buffer()
+    return ser
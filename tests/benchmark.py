@@ -7,42 +7,39 @@ Usage::
 
     python benchmark.py                   # auto-detect Arduino port
     python benchmark.py --port=/dev/ttyACM0
+    python benchmark.py --no-reset        # skip 2 s reset wait (POSIX, after a normal run)
+
+``--no-reset`` relies on a previous run having left DTR asserted (see
+``_serial_utils.open_serial``); the first run after plugging the board in
+must not use it.
+
+On POSIX, running this script clears HUPCL on the port, which persists after
+it exits: other programs (including the desktop app) opening the port will no
+longer reset the board until it is re-plugged or ``stty -F <port> hupcl`` is run.
 """
 
+import os
+import select
 import serial
-import serial.tools.list_ports
 import time
 import sys
+from collections import namedtuple
+
+from _serial_utils import find_arduino_port, open_serial
 
 # Configuration
 BAUD_RATE = 2000000
 MEASURE_DURATION = 10.0  # Seconds
+WARMUP_DURATION = 0.2    # Seconds of data discarded after each mode switch
+
+BenchmarkCase = namedtuple("BenchmarkCase", "name cmd target")
 
 TEST_CASES = [
-    {"name": "1 kHz",  "cmd": b'\x10', "target": 1000},
-    {"name": "10 kHz", "cmd": b'\x11', "target": 10000},
-    {"name": "20 kHz", "cmd": b'\x12', "target": 20000},
+    BenchmarkCase("1 kHz",  b'\x10', 1000),
+    BenchmarkCase("10 kHz", b'\x11', 10000),
+    BenchmarkCase("20 kHz", b'\x12', 20000),
 ]
 
-def find_arduino_port():
-    """
-    Auto-detects the serial port of the Arduino.
-    Returns the port name (e.g., '/dev/ttyACM0' or 'COM3').
-    Raises Exception if not found.
-    """
-    ports = list(serial.tools.list_ports.comports())
-    for p in ports:
-        # Check for common Arduino identifiers
-        if "Arduino" in p.description or "CH340" in p.description or "USB Serial" in p.description or "ACM" in p.device:
-            print(f"Auto-detected Arduino on port: {p.device} ({p.description})")
-            return p.device
-    
-    # Fallback/Error
-    print("Available ports:")
-    for p in ports:
-        print(f" - {p.device}: {p.description}")
-    raise Exception("Could not find Arduino. Please specify port manually using --port")
-
 def run_benchmark():
     """Execute the sampling-rate benchmark across all configured test cases.
 
@@ -55,9 +52,10 @@ def run_benchmark():
     """
     # 1. Detect Port
     port = ""
-    if len(sys.argv) > 1 and sys.argv[1].startswith("--port="):
-        port = sys.argv[1].split("=")[1]
-    else:
+    for arg in sys.argv[1:]:
+        if arg.startswith("--port="):
+            port = arg.split("=")[1]
+    if not port:
         try:
             port = find_arduino_port()
         except Exception as e:
@@ -66,8 +64,7 @@ def run_benchmark():
 
     # 2. Open Connection
     try:
-        ser = serial.Serial(port, BAUD_RATE, timeout=0.1)
-        time.sleep(2.0) # Wait for Arduino reset
+        ser = open_serial(port, BAUD_RATE, timeout=0.005, reset="--no-reset" not in sys.argv[1:])
     except Exception as e:
         print(f"Failed to open port {port}: {e}")
         sys.exit(1)
@@ -79,49 +76,82 @@ def run_benchmark():
     print(f"{'Mode':<10} | {'Target Hz':<10} | {'Actual Hz':<10} | {'Samples':<10} | {'Error %':<10}")
     print("-" * 65)
 
-    for test in TEST_CASES:
-        # Stop first to ensure clean state
-        ser.write(b'\x02') 
-        time.sleep(0.1)
-        ser.reset_input_buffer()
+    # Single receive buffer filled by every read in the measurement loops
+    # (POSIX reads land in it directly; on Windows pyserial's readinto still
+    # allocates a bytes object per read and copies it in)
+    buf = memoryview(bytearray(65536))
 
-        # Set Rate
-        ser.write(test["cmd"])
-        time.sleep(0.05)
-
-        # Start Transmission
-        ser.write(b'\x01')
+    # Always stop the stream and close the port, even on Ctrl-C or an error:
+    # open_serial keeps DTR asserted on close, so the next open will not
+    # reset a board that was left streaming.
+    try:
+        for test in TEST_CASES:
+            # Stop, set rate and start in a single write. The three command
+            # bytes fit in the ATmega's 2-byte RX FIFO plus shift register, so
+            # the firmware cannot drop any of them.
+            ser.write(b'\x02' + test.cmd + b'\x01')
         
-        # Warm-up (discard initial data)
-        time.sleep(0.2)
-        ser.reset_input_buffer()
-
-        # Measurement Loop
-        total_bytes = 0
-        start_time = time.perf_counter()
+            # Warm-up (discard initial data and anything left from the last mode)
+            time.sleep(WARMUP_DURATION)
+            ser.reset_input_buffer()
+
+            # Measurement Loop (integer nanoseconds, no per-iteration float math)
+            total_bytes = 0
+            start_ns = time.monotonic_ns()
+            deadline_ns = start_ns + int(MEASURE_DURATION * 1e9)
+        
+            # Bind hot-loop callables to locals (LOAD_FAST instead of attribute lookups)
+            _now = time.monotonic_ns
         
-        while (time.perf_counter() - start_time) < MEASURE_DURATION:
-            if ser.in_waiting:
-                data = ser.read(ser.in_waiting)
-                total_bytes += len(data)
+            if os.name == "posix":
+                # POSIX: block in select() until bytes arrive or the deadline
+                # passes, then read the raw fd directly into the pre-allocated
+                # buffer, bypassing pyserial's per-call bookkeeping.
+                fd = ser.fileno()
+                fds = [fd]
+                bufs = [buf]
+                _select = select.select
+                _readv = os.readv
+                while True:
+                    remaining_ns = deadline_ns - _now()
+                    if remaining_ns <= 0:
+                        break
+                    ready, _, _ = _select(fds, (), (), remaining_ns / 1e9)
+                    if ready:
+                        n = _readv(fd, bufs)
+                        if n == 0:
+                            # Readable but empty: the device hung up (e.g. unplugged)
+                            raise serial.SerialException(
+                                "device reports readiness to read but returned no data "
+                                "(device disconnected or multiple access on port?)")
+                        total_bytes += n
             else:
-                time.sleep(0.001) # Prevent CPU spin
+                # Windows: no selectable fd, fall back to blocking bulk reads that
+                # return as soon as bytes arrive or the port timeout fires.
+                # readinto() is read() plus a copy here, not allocation-free.
+                _readinto = ser.readinto
+                while _now() < deadline_ns:
+                    total_bytes += _readinto(buf)
         
-        end_time = time.perf_counter()
+            end_ns = min(time.monotonic_ns(), deadline_ns)
         
-        # Stop Transmission
-        ser.write(b'\x02')
-
-        # Calculations
-        actual_duration = end_time - start_time
-        total_samples = total_bytes / 2
-        actual_hz = total_samples / actual_duration
-        error_percent = abs(test["target"] - actual_hz) / test["target"] * 100
-
-        # Output Row
-        print(f"{test['name']:<10} | {test['target']:<10} | {actual_hz:<10.2f} | {int(total_samples):<10} | {error_percent:<10.2f}%")
+            # Stop Transmission
+            ser.write(b'\x02')
+
+            # Calculations
+            actual_duration = (end_ns - start_ns) / 1e9
+            total_samples = total_bytes / 2
+            actual_hz = total_samples / actual_duration
+            error_percent = abs(test.target - actual_hz) / test.target * 100
+
+            # Output Row
+            print(f"{test.name:<10} | {test.target:<10} | {actual_hz:<10.2f} | {int(total_samples):<10} | {error_percent:<10.2f}%")
+    finally:
+        try:
+            ser.write(b'\x02')
+        finally:
+            ser.close()
 
-    ser.close()
     print("\nBenchmark Complete.")
 
 if __name__ == "__main__":
@@ -8,33 +8,28 @@ Usage::
 
     python integration_test.py                        # auto-detect port
     python integration_test.py --port /dev/ttyACM0    # explicit port
+    python integration_test.py -v                     # verbose, incl. debug data dumps
+    python integration_test.py --no-reset             # skip 2 s reset wait (POSIX, after a normal run)
+
+``--no-reset`` relies on a previous run having left DTR asserted (see
+``_serial_utils.open_serial``); the first run after plugging the board in
+must not use it.
+
+On POSIX, running this script clears HUPCL on the port, which persists after
+it exits: other programs (including the desktop app) opening the port will no
+longer reset the board until it is re-plugged or ``stty -F <port> hupcl`` is run.
 """
 
+import logging
 import unittest
+import numpy as np
 import serial
-import serial.tools.list_ports
 import time
 import sys
 
-def find_arduino_port():
-    """
-    Auto-detects the serial port of the Arduino.
-    Returns the port name (e.g., '/dev/ttyACM0' or 'COM3').
-    Raises Exception if not found.
-    """
-    ports = list(serial.tools.list_ports.comports())
-    for p in ports:
-        # Check for common Arduino identifiers in the description or manufacturer
-        # Note: "USB Serial" is common for CH340 clones
-        if "Arduino" in p.description or "CH340" in p.description or "USB Serial" in p.description or "ACM" in p.device:
-            print(f"Auto-detected Arduino on port: {p.device} ({p.description})")
-            return p.device
-    
-    # Fallback/Error
-    print("Available ports:")
-    for p in ports:
-        print(f" - {p.device}: {p.description}")
-    raise Exception("Could not find Arduino. Please specify port manually using --port")
+from _serial_utils import find_arduino_port, open_serial
+
+logger = logging.getLogger(__name__)
 
 # Default configuration
 # If --port is not passed, try to auto-detect
@@ -51,35 +46,106 @@ else:
 
 BAUD_RATE = 2000000
 
+# Set by --no-reset: skip the DTR reset pulse and the bootloader wait
+NO_RESET = False
+
+# Maps bytes with the sync bit (0x80) set to 0x01 and all others to 0x00,
+# so bytes.translate + bytes.find locate the first High Byte in C
+_HIGH_BIT_TABLE = bytes(1 if b & 0x80 else 0 for b in range(256))
+
+# High-bit (sync marker) mask for 8 packed bytes
+_HIGH_BITS_U64 = np.uint64(0x8080808080808080)
+
+class _LazyHex:
+    """Defers ``bytes.hex()`` formatting until the log record is emitted."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return self.data.hex()
+
+def _xor_checksum(payload):
+    """
+    XOR of all payload bytes, as computed by the firmware for the handshake.
+    """
+    return int(np.bitwise_xor.reduce(np.frombuffer(payload, dtype=np.uint8), initial=0))
+
+def _count_high_bytes(data):
+    """
+    Counts bytes with the sync bit (0x80) set, eight bytes per word (SWAR).
+    """
+    arr = np.frombuffer(data, dtype=np.uint8)
+    split = len(arr) // 8 * 8
+    words = arr[:split].view(np.uint64) & _HIGH_BITS_U64
+    tail = arr[split:] & 0x80
+    return int(np.unpackbits(words.view(np.uint8)).sum()) + int(np.count_nonzero(tail))
+
+# Handshake response: ID string followed by its 1-byte XOR checksum
+EXPECTED_ID = b"OSC_V1\n"
+EXPECTED_CHECKSUM = _xor_checksum(EXPECTED_ID)
+
 class TestFirmwareProtocol(unittest.TestCase):
     """
     Integration tests for ATmega328P Firmware via UART.
     """
 
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         """
-        Setup method run before EACH test.
-        Opens the serial port and waits for the board to reset.
+        Setup method run ONCE for the whole class.
+        Opens the serial port and waits for the board to reset, so the
+        bootloader delay is paid once instead of before every test.
         """
         try:
-            self.ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=0.5)
-            # Opening the port on Arduino usually triggers a reset (DTR toggle).
-            # Wait for bootloader to finish and firmware to start.
-            time.sleep(2.0)
-            self.ser.reset_input_buffer()
-            self.ser.reset_output_buffer()
+            # Opening the port on Arduino usually triggers a reset (DTR toggle);
+            # open_serial waits for the bootloader unless --no-reset was given.
+            cls.ser = open_serial(SERIAL_PORT, BAUD_RATE, timeout=0.5, reset=not NO_RESET)
         except serial.SerialException as e:
-            self.fail(f"Could not open serial port {SERIAL_PORT}: {e}")
+            raise cls.failureException(f"Could not open serial port {SERIAL_PORT}: {e}") from e
+        # Read for a short period BEFORE any command is sent, so the boot
+        # silence test sees the firmware exactly as it came up.
+        try:
+            cls.boot_data = cls.ser.read(10)
+        except BaseException:
+            # tearDownClass does not run when setUpClass fails
+            cls.ser.close()
+            raise
 
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """
-        Teardown method run after EACH test.
+        Teardown method run after ALL tests.
         Stops sampling and closes the port.
         """
-        if self.ser and self.ser.is_open:
-            # Try to stop sampling to leave device in clean state
-            self.ser.write(b'\x02') 
-            self.ser.close()
+        if cls.ser and cls.ser.is_open:
+            # Try to stop sampling to leave device in clean state; close the
+            # port even if the write fails
+            try:
+                cls.ser.write(b'\x02')
+            finally:
+                cls.ser.close()
+
+    def setUp(self):
+        """
+        Setup method run before EACH test.
+        Brings the already-running firmware to a known state: stopped,
+        default 1 kHz rate, empty buffers.
+        """
+        self.ser = type(self).ser
+        self._cmd(b'\x02\x10') # STOP + 1 kHz
+        time.sleep(0.05) # Let in-flight samples reach the host before flushing
+        self.ser.reset_input_buffer()
+        self.ser.reset_output_buffer()
+
+    def _cmd(self, command):
+        """
+        Sends a command and blocks until it has physically left the host,
+        then gives the firmware a moment to act on it.
+        """
+        self.ser.write(command)
+        self.ser.flush()
+        time.sleep(0.002)
 
     def test_connection_and_silence_on_boot(self):
         """
@@ -87,8 +153,8 @@ class TestFirmwareProtocol(unittest.TestCase):
         """
         print("\n[Test] Connection and Silence on Boot")
         
-        # Read for a short period
-        data = self.ser.read(10)
+        # Captured in setUpClass, before the first command was written
+        data = self.boot_data
         
         # Assert that buffer is empty (timeout occurred and no bytes read)
         self.assertEqual(len(data), 0, f"Received unexpected data on boot: {data.hex()}")
@@ -101,7 +167,7 @@ class TestFirmwareProtocol(unittest.TestCase):
         print("\n[Test] Start Command and Data Flow")
         
         # Send START command
-        self.ser.write(b'\x01')
+        self._cmd(b'\x01')
         
         # Read a chunk of data
         # We expect data to flow immediately. 
@@ -109,7 +175,7 @@ class TestFirmwareProtocol(unittest.TestCase):
         data = self.ser.read(100)
         
         self.assertGreater(len(data), 0, "No data received after START command.")
-        print(f"Received data sample: {data[:20].hex()}")
+        logger.debug("Received data sample: %s", _LazyHex(data[:20]))
         self.assertEqual(len(data), 100, "Timeout while reading data stream.")
         print(f"PASS: Received {len(data)} bytes after START.")
 
@@ -119,52 +185,38 @@ class TestFirmwareProtocol(unittest.TestCase):
         """
         print("\n[Test] Packet Integrity and Sync")
         
-        self.ser.write(b'\x01') # START
+        self._cmd(b'\x01') # START
         time.sleep(0.1) # Buffer some data
         
         data = self.ser.read(200)
         self.assertTrue(len(data) > 50, "Not enough data for analysis.")
         
-        valid_packets = 0
-        sync_errors = 0
-        
         # We need to find the first High Byte to start parsing
-        start_index = -1
-        for i in range(len(data)):
-            if (data[i] & 0x80) == 0x80:
-                start_index = i
-                break
+        start_index = data.translate(_HIGH_BIT_TABLE).find(b'\x01')
         
         self.assertNotEqual(start_index, -1, "No High Byte (Sync bit) found in stream.")
         
-        # Iterate through pairs
-        i = start_index
-        while i < len(data) - 1:
-            high = data[i]
-            low = data[i+1]
-            
-            # Check High Byte Marker
-            if (high & 0x80) != 0x80:
-                # Lost sync or garbage data
-                sync_errors += 1
-                i += 1 # Try to resync next byte
-                continue
-                
-            # Check Low Byte Marker
-            if (low & 0x80) != 0x00:
-                # The byte following a high byte was not a low byte.
-                # It might be another high byte (missed low byte?)
-                sync_errors += 1
-                i += 1 # Treat current 'low' as potential 'high' for next iter
-                continue
+        # Classify every byte once, then count High->Low pairs in one pass.
+        # A High Byte followed by a Low Byte is a valid packet; any byte not
+        # covered by such a pair is a sync error (lost or garbage byte).
+        arr = np.frombuffer(data, dtype=np.uint8)[start_index:]
+        high = (arr & 0x80) == 0x80
+        pairs = high[:-1] & ~high[1:]
+        covered = np.zeros(len(arr), dtype=bool)
+        covered[:-1] |= pairs
+        covered[1:] |= pairs
+        valid_packets = int(pairs.sum())
+        sync_errors = int((~covered[:-1]).sum())
+        
+        # Alternating High/Low bytes means about half the stream has the
+        # sync bit set; a larger imbalance points at lost bytes.
+        high_bytes = _count_high_bytes(data)
+        imbalance = abs(len(data) - 2 * high_bytes)
             
-            # If we got here, we have a valid pair
-            valid_packets += 1
-            i += 2
-            
-        print(f"Analyzed {len(data)} bytes. Valid Packets: {valid_packets}, Sync Errors: {sync_errors}")
+        print(f"Analyzed {len(data)} bytes. Valid Packets: {valid_packets}, Sync Errors: {sync_errors}, High Bytes: {high_bytes}")
         self.assertGreater(valid_packets, 0, "No valid packets found.")
         self.assertLess(sync_errors, 5, "Too many sync errors, unreliable connection.")
+        self.assertLess(imbalance, 5, f"High/Low byte imbalance of {imbalance}, stream lost sync.")
         print("PASS: Packet structure is valid.")
 
     def test_value_reconstruction_range(self):
@@ -173,34 +225,33 @@ class TestFirmwareProtocol(unittest.TestCase):
         """
         print("\n[Test] Value Reconstruction and Range")
         
-        self.ser.write(b'\x01') # START
+        self._cmd(b'\x01') # START
         time.sleep(0.1)
         data = self.ser.read(100)
         
         # Find sync
-        start_index = 0
-        while start_index < len(data) and (data[start_index] & 0x80) == 0:
-            start_index += 1
-            
-        reconstructed_values = []
-        
-        for i in range(start_index, len(data)-1, 2):
-            high = data[i]
-            low = data[i+1]
+        start_index = data.translate(_HIGH_BIT_TABLE).find(b'\x01')
+        if start_index == -1:
+            start_index = len(data)
             
-            if (high & 0x80) == 0x80 and (low & 0x80) == 0x00:
-                # Reassemble
-                # High byte: 1 0 0 0 0 D9 D8 D7 (Bits 0-2 are data)
-                # Low byte:  0 D6 D5 D4 D3 D2 D1 D0 (Bits 0-6 are data)
-                
-                val = ((high & 0x07) << 7) | (low & 0x7F)
-                reconstructed_values.append(val)
-                
-                self.assertTrue(0 <= val <= 1023, f"Value out of range: {val}")
-        
-        self.assertGreater(len(reconstructed_values), 0, "No values reconstructed.")
+        arr = np.frombuffer(data, dtype=np.uint8)[start_index:]
+        arr = arr[:len(arr) // 2 * 2]
+        high = arr[0::2]
+        low = arr[1::2]
+        mask = ((high & 0x80) == 0x80) & ((low & 0x80) == 0x00)
+        
+        # Reassemble
+        # High byte: 1 0 0 0 0 D9 D8 D7 (Bits 0-2 are data)
+        # Low byte:  0 D6 D5 D4 D3 D2 D1 D0 (Bits 0-6 are data)
+        reconstructed_values = ((high[mask].astype(np.uint16) & 0x07) << 7) | (low[mask] & 0x7F)
+        
+        self.assertGreater(reconstructed_values.size, 0, "No values reconstructed.")
+        min_value = int(reconstructed_values.min())
+        max_value = int(reconstructed_values.max())
+        self.assertTrue(0 <= min_value and max_value <= 1023,
+                        f"Values out of range: [{min_value}, {max_value}]")
         print(f"PASS: Checked {len(reconstructed_values)} samples. All within [0, 1023].")
-        print(f"Sample values: {reconstructed_values[:10]}...")
+        print(f"Sample values: {reconstructed_values[:10].tolist()}...")
 
     def test_handshake_and_checksum(self):
         """
@@ -214,7 +265,7 @@ class TestFirmwareProtocol(unittest.TestCase):
         self.ser.reset_input_buffer()
         
         # Send Handshake
-        self.ser.write(b'?')
+        self._cmd(b'?')
         
         # Read response
         # "OSC_V1\n" is 7 bytes. + 1 byte checksum = 8 bytes total.
@@ -227,16 +278,11 @@ class TestFirmwareProtocol(unittest.TestCase):
         received_checksum = response[-1]
         
         # Assertion 1: Verify ID String
-        expected_string = b"OSC_V1\n"
-        self.assertEqual(id_string, expected_string, f"Invalid ID string. Expected {expected_string}, got {id_string}")
+        self.assertEqual(id_string, EXPECTED_ID, f"Invalid ID string. Expected {EXPECTED_ID}, got {id_string}")
         
         # Assertion 2: Verify Checksum
-        expected_checksum = 0
-        for byte in expected_string:
-            expected_checksum ^= byte
-            
-        self.assertEqual(received_checksum, expected_checksum, 
-                         f"Checksum mismatch. Calc: {hex(expected_checksum)}, Recv: {hex(received_checksum)}")
+        self.assertEqual(received_checksum, EXPECTED_CHECKSUM, 
+                         f"Checksum mismatch. Calc: {hex(EXPECTED_CHECKSUM)}, Recv: {hex(received_checksum)}")
         
         print(f"PASS: Handshake verified. ID: {id_string.strip()}, Checksum: {hex(received_checksum)}")
 
@@ -248,13 +294,13 @@ class TestFirmwareProtocol(unittest.TestCase):
         
         # Send garbage
         garbage = b'\xFF\xAB\x00\xCA\xFE'
-        self.ser.write(garbage)
+        self._cmd(garbage)
         
         # Wait a moment to ensure no crash/reset loop triggered immediately
         time.sleep(0.5)
         
         # Verify device is still responsive by sending a valid START command
-        self.ser.write(b'\x01')
+        self._cmd(b'\x01')
         
         # Read data
         data = self.ser.read(50)
@@ -269,11 +315,11 @@ class TestFirmwareProtocol(unittest.TestCase):
         print("\n[Test] Stop Command")
         
         # First start and ensure data is flowing
-        self.ser.write(b'\x01')
+        self._cmd(b'\x01')
         self.ser.read(100) # Clear some data
         
         # Send STOP
-        self.ser.write(b'\x02')
+        self._cmd(b'\x02')
         
         # Allow time for firmware to process and buffer to drain
         time.sleep(0.1)
@@ -295,11 +341,10 @@ class TestFirmwareProtocol(unittest.TestCase):
         print("\n[Test] Turbo Mode (20kHz)")
         
         # Set Rate to 20kHz
-        self.ser.write(b'\x12')
-        time.sleep(0.1)
+        self._cmd(b'\x12')
         
         # Start
-        self.ser.write(b'\x01')
+        self._cmd(b'\x01')
         
         # Read data
         # At 20kHz, we get ~40000 bytes/sec.
@@ -310,10 +355,19 @@ class TestFirmwareProtocol(unittest.TestCase):
         print(f"Received {len(data)} bytes in ~0.1s (Expected ~4000)")
         
         # Stop
-        self.ser.write(b'\x02')
+        self._cmd(b'\x02')
 
 if __name__ == '__main__':
+    # Show debug diagnostics (e.g. data sample dumps) in verbose mode;
+    # -v is left in argv so unittest also runs verbosely
+    if '-v' in sys.argv or '--verbose' in sys.argv:
+        logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+
     # Parse custom arguments
+    if '--no-reset' in sys.argv:
+        NO_RESET = True
+        sys.argv.remove('--no-reset')
+
     if '--port' in sys.argv:
         idx = sys.argv.index('--port')
         if idx + 1 < len(sys.argv):